@@ -1,53 +1,272 @@
 import spotipy
+import requests
 from spotipy.oauth2 import SpotifyOAuth
-from typing import Optional
+from spotipy.cache_handler import CacheFileHandler
+from spotipy.exceptions import SpotifyException
+from rapidfuzz import fuzz
+from typing import AsyncIterator, Optional
 import logging
+import logging.handlers
 from dotenv import load_dotenv
 import os
 import time
+import asyncio
+import functools
+import inspect
+import re
+import string
+import random
+import weakref
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
 
+try:
+    # optional, faster JSON decoding of API responses
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+MAX_RETRIES = 5
+# default ceiling on API calls per minute across all threads, well above what sequential calls reach;
+# it only smooths out bursts from concurrent requests, and 429s are still handled by backing off
+RATE_LIMIT = 1200
+# calls allowed back to back before the rate limit paces them, about one per concurrent search
+RATE_LIMIT_BURST = 10
+# HTTP connections kept open to the API, enough for concurrent searches, page fetches and uploads
+CONNECTION_POOL_SIZE = 50
+# only the playlist item fields Playlist.add_track_from_items reads, to keep page responses small
+_PLAYLIST_ITEM_FIELDS = "items(track(id,name,artists(id,name),explicit,external_ids(isrc),album(id)))"
+# characters removed from search queries, since they only add noise to the full-text match
+_QUERY_STRIP_TABLE = str.maketrans("", "", "()[]&\"")
+
+class LeakyBucket:
+    # allows up to `rate` calls per `period` seconds, refilling steadily, with at most `burst` calls
+    # back to back; callers over the limit sleep until their turn. thread-safe, since API calls
+    # are made from worker threads
+    def __init__(self, rate: int, period: float, burst: int):
+        if rate < 1 or burst < 1:
+            raise ValueError("rate and burst must be at least 1")
+        self.rate = rate
+        self.period = period
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate / self.period)
+            self._updated = now
+            # going negative reserves the next free slot, so concurrent callers queue up in order
+            self._tokens -= 1
+            wait = -self._tokens * self.period / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+    def set_rate(self, rate: int) -> None:
+        if rate < 1:
+            raise ValueError("rate must be at least 1")
+        with self._lock:
+            self.rate = rate
+
+# shared by every API call, so parallel requests are spread out instead of bursting into 429s
+_rate_limiter = LeakyBucket(rate = RATE_LIMIT, period = 60, burst = RATE_LIMIT_BURST)
+
+def _with_retry(fn, *args, **kwargs):
+    # call a Spotify API method, backing off exponentially (with jitter) when rate limited
+    delay = 1
+    for attempt in range(MAX_RETRIES):
+        _rate_limiter.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except SpotifyException as e:
+            if e.http_status != 429 or attempt == MAX_RETRIES - 1:
+                raise
+            wait = max(int((e.headers or {}).get('Retry-After', delay)), delay)
+            logger.warning("Rate limited, retrying in %d seconds", wait)
+            time.sleep(wait + random.uniform(0, 0.5))
+            delay *= 2
+
+def _decode_json_with_orjson(response, *args, **kwargs):
+    # requests response hook: spotipy calls response.json(), so swap in orjson's faster decoder
+    response.json = lambda **json_kwargs: orjson.loads(response.content)
+    return response
+
+# version tags that don't change which song it is, e.g. "(Clean)", "[Radio Edit]" or "- Explicit Version";
+# only when the tag is all there is, so "Crazy - Clean Bandit Remix" keeps its remix name
+_VERSION_TAG_RE = re.compile(r"\s*(?:[(\[]\s*|-\s*)(?:clean|explicit|radio edit)(?:\s+(?:version|edit))?\s*(?:[)\]]|$)")
+# featured artist tags, e.g. "(feat. Drake)", "[ft. X]" or "- feat. X"; clean releases often credit them differently
+_FEATURE_TAG_RE = re.compile(r"\s*(?:[(\[]\s*(?:feat|ft)\b[^)\]]*[)\]]|-\s*(?:feat|ft)\b.*$)")
+# punctuation becomes spaces, so "Hill-Perry" and "Hill Perry" compare equal
+_PUNCTUATION_TABLE = str.maketrans(string.punctuation, " " * len(string.punctuation))
+
+@functools.lru_cache(maxsize = 4096)
+def _normalize(text: str) -> str:
+    # lowercase, strip version and featured artist tags and punctuation, and collapse whitespace
+    # for matching; the same names come up again and again in search results and albums, so cache them
+    text = text.lower()
+    # keep the full name if it's nothing but tags, so e.g. "(Clean)" doesn't normalize to nothing
+    stripped = _VERSION_TAG_RE.sub("", _FEATURE_TAG_RE.sub("", text)).strip() or text
+    return " ".join(stripped.translate(_PUNCTUATION_TABLE).split())
+
+def _names_match(name: str, artist: str, artist_id: Optional[str], track: "Track") -> bool:
+    # for finding clean versions, compare normalized names and artists, falling back to fuzzy matching;
+    # the same artist ID settles the artist without normalizing the artist name at all (a different ID
+    # still falls back to the names, since one artist can have several profiles)
+    if not (artist_id and artist_id == track.artist_id):
+        artist_key = _normalize(artist)
+        if artist_key != track._artist_key and fuzz.ratio(artist_key, track._artist_key) < 90:
+            return False
+    name_key = _normalize(name)
+    # token_sort_ratio penalises extra words, so "Money Trees" isn't taken for "Money"
+    return name_key == track._name_key or fuzz.token_sort_ratio(name_key, track._name_key) >= 85
+
 class Track:
-    def __init__(self, id: str, name: str, artist: str, is_clean: bool = False):
+    __slots__ = ('id', 'name', 'artist', 'is_clean', 'isrc', 'album_id', 'artist_id', '_name_lc', '_artist_lc', '_name_key', '_artist_key', '__weakref__')
+
+    def __init__(self, id: str, name: str, artist: str, is_clean: bool = False, isrc: Optional[str] = None, album_id: Optional[str] = None, artist_id: Optional[str] = None):
         self.id = id
         self.name = name
         self.artist = artist
         self.is_clean = is_clean
+        self.isrc = isrc
+        self.album_id = album_id
+        self.artist_id = artist_id
+        # lowercase forms used to deduplicate tracks, and normalized forms used when matching them
+        self._name_lc = name.lower()
+        self._artist_lc = artist.lower()
+        self._name_key = _normalize(name)
+        self._artist_key = _normalize(artist)
 
     def __str__(self) -> str:
         return f"{self.name} by {self.artist} ({"Clean" if self.is_clean else "Explicit"})"
     
     def matches_track(self, other_track: "Track") -> bool:
-        # for finding clean versions, check if track matches another track by name and artist
-        return (self.name.lower() in other_track.name.lower() or other_track.name.lower() in self.name.lower()) and self.artist.lower() == other_track.artist.lower()
-    
+        return _names_match(self.name, self.artist, self.artist_id, other_track)
+
+# tracks loaded from playlists, shared by id; entries go away once no playlist holds the track
+_TRACK_POOL: weakref.WeakValueDictionary[str, Track] = weakref.WeakValueDictionary()
+
 class Playlist:
+    __slots__ = ('id', 'name', '_tracks', '_id_index', '_removed_count')
+
     def __init__(self, id: str, name: str, tracks: list[Track] = None):
         self.id = id
         self.name = name
-        self.tracks = tracks or []
+        self._tracks = []
+        # track id -> positions in self._tracks, so removals don't scan the whole list
+        self._id_index: dict[str, list[int]] = {}
+        self._removed_count = 0
+        for track in tracks or []:
+            self.add_track(track)
+
+    @property
+    def tracks(self) -> list[Track]:
+        # removed tracks are left as None until the list is next read, then compacted in one pass
+        if self._removed_count:
+            self._tracks = [t for t in self._tracks if t is not None]
+            self._id_index = {}
+            for i, track in enumerate(self._tracks):
+                self._id_index.setdefault(track.id, []).append(i)
+            self._removed_count = 0
+        return self._tracks
     
     def add_track(self, track: Track) -> None:
-        self.tracks.append(track)
+        self._id_index.setdefault(track.id, []).append(len(self._tracks))
+        self._tracks.append(track)
     
     def remove_track(self, track: Track) -> None:
-        self.tracks = [t for t in self.tracks if t.id != track.id]
+        for i in self._id_index.pop(track.id, []):
+            self._tracks[i] = None
+            self._removed_count += 1
 
     def get_track_count(self) -> int:
-        return len(self.tracks)
+        return len(self._tracks) - self._removed_count
     
     def __str__(self) -> str:
         return f"{self.name} ({self.get_track_count()} tracks)"
     
-    def add_track_from_items(self, items: list) -> None:
-        for item in items:
-            track = item['track']
-            self.add_track(Track(
-                id=track['id'],
-                name=track['name'],
-                artist=track['artists'][0]['name'],
-                is_clean=not track.get('explicit', False)
-            ))
+    def add_track_from_items(self, items: list) -> list[Track]:
+        # build the whole page first and extend the list once; deleted tracks (None) and
+        # local files (no id) can't be searched or added to a playlist, so skip them
+        new_tracks = [_track_from_item(item['track']) for item in items if item.get('track') and item['track'].get('id')]
+        for i, track in enumerate(new_tracks, len(self._tracks)):
+            self._id_index.setdefault(track.id, []).append(i)
+        self._tracks.extend(new_tracks)
+        return new_tracks
+
+def _track_from_item(track: dict) -> Track:
+    # reuse the Track object if this id was already loaded (e.g. by another playlist)
+    found_track = _TRACK_POOL.get(track['id'])
+    if found_track is None:
+        found_track = Track(
+            id=track['id'],
+            name=track['name'],
+            artist=track['artists'][0]['name'],
+            is_clean=not track.get('explicit', False),
+            isrc=track.get('external_ids', {}).get('isrc'),
+            album_id=track.get('album', {}).get('id'),
+            artist_id=track['artists'][0].get('id')
+        )
+        _TRACK_POOL[track['id']] = found_track
+    return found_track
+
+# marks an explicit track that isn't in the match cache (None means it has no clean version)
+_MISSING = object()
+
+class TrackMatchCache:
+    # explicit track id -> clean version, stored in SQLite so later runs can skip searching;
+    # misses expire after miss_ttl seconds in case a clean version is released later
+    def __init__(self, path: str = "clean_cache.db", miss_ttl: int = 7 * 24 * 60 * 60):
+        self.miss_ttl = miss_ttl
+        # searches run in worker threads, so share one connection behind a lock
+        self._conn = sqlite3.connect(path, check_same_thread = False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS matches ("
+                "explicit_id TEXT PRIMARY KEY, clean_id TEXT, clean_name TEXT, clean_artist TEXT, ts INTEGER NOT NULL)"
+            )
+
+    def get(self, explicit_id: str, default = _MISSING):
+        # return the cached clean Track, None for a known miss, or default if not cached (or expired)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT clean_id, clean_name, clean_artist, ts FROM matches WHERE explicit_id = ?", (explicit_id,)
+            ).fetchone()
+        if row is None:
+            return default
+        clean_id, clean_name, clean_artist, ts = row
+        if clean_id is None:
+            return None if time.time() - ts < self.miss_ttl else default
+        return Track(id = clean_id, name = clean_name, artist = clean_artist, is_clean = True)
+
+    def __contains__(self, explicit_id: str) -> bool:
+        return self.get(explicit_id) is not _MISSING
+
+    def set(self, explicit_id: str, clean_track: Optional[Track]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?)",
+                (
+                    explicit_id,
+                    clean_track.id if clean_track else None,
+                    clean_track.name if clean_track else None,
+                    clean_track.artist if clean_track else None,
+                    int(time.time())
+                )
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
 
 # base abstract SpotifyBot class
 class SpotifyBot(ABC):
@@ -68,29 +287,66 @@ class SpotifyBot(ABC):
         pass
     
     @abstractmethod
-    def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
+    async def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
+        pass
+
+    @abstractmethod
+    def stream_playlist(self, playlist_id: str) -> AsyncIterator[tuple[Playlist, list[Track]]]:
+        pass
+
+    @abstractmethod
+    def delete_playlist(self, playlist_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def cache_tracks(self, tracks: list[Track]) -> None:
+        pass
+
+    @abstractmethod
+    def cache_albums(self, album_ids: list[str]) -> None:
         pass
 
 class SpotifyAuthenticator(SpotifyBot):
-    def __init__(self, client_id: str, client_secret: str, redirect_uri: str):
+    def __init__(self, client_id: str, client_secret: str, redirect_uri: str, cache_path: str = ".cache-spotify"):
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
+        self.cache_path = cache_path
         self.sp = None
     
     def authenticate(self) -> spotipy.Spotify:
         # set up the authentication for Spotify API
         try:
-            self.sp = spotipy.Spotify(auth_manager = SpotifyOAuth(
+            auth_manager = SpotifyOAuth(
                 client_id = self.client_id,
                 client_secret = self.client_secret,
                 redirect_uri = self.redirect_uri,
-                scope = "playlist-modify-public playlist-read-private"
+                scope = "playlist-modify-public playlist-read-private",
+                # reuse (and silently refresh) the token from previous runs
+                cache_handler = CacheFileHandler(cache_path = self.cache_path)
+            )
+            self.sp = spotipy.Spotify(
+                auth_manager = auth_manager,
+                # leave 429s to _with_retry, which waits as long as Retry-After says and goes through the
+                # rate limiter; spotipy would otherwise retry them itself and raise without the response
+                # headers once it gave up (see also respect_retry_after_header below)
+                status_forcelist = tuple(code for code in spotipy.Spotify.default_retry_codes if code != 429)
+            )
+            # spotipy's default pool keeps only 10 connections, so parallel requests beyond that
+            # would open (and TLS handshake) new ones; keep spotipy's retry settings, except that urllib3
+            # retries any response with a Retry-After header, which would still swallow 429s
+            retries = self.sp._session.get_adapter("https://").max_retries.new(respect_retry_after_header = False)
+            self.sp._session.mount("https://", requests.adapters.HTTPAdapter(
+                pool_connections = CONNECTION_POOL_SIZE,
+                pool_maxsize = CONNECTION_POOL_SIZE,
+                max_retries = retries
             ))
-            logging.info("Successfully authenticated with Spotify Web API")
+            if orjson:
+                self.sp._session.hooks['response'].append(_decode_json_with_orjson)
+            logger.info("Successfully authenticated with Spotify Web API")
             return True
         except Exception as e:
-            logging.error(f"Authentication failed: {str(e)}")
+            logger.error("Authentication failed: %s", e)
             return False
 
     # implement other abstract methods with pass
@@ -103,37 +359,178 @@ class SpotifyAuthenticator(SpotifyBot):
     def add_tracks(self, playlist_id: str, track_ids: list[str]) -> bool:
         pass
 
-    def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
+    async def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
+        pass
+
+    def stream_playlist(self, playlist_id: str) -> AsyncIterator[tuple[Playlist, list[Track]]]:
+        pass
+
+    def delete_playlist(self, playlist_id: str) -> bool:
+        pass
+
+    def cache_tracks(self, tracks: list[Track]) -> None:
+        pass
+
+    def cache_albums(self, album_ids: list[str]) -> None:
         pass
 
 class SpotifyTrackSearcher(SpotifyBot):
-    def __init__(self, spotify_client: spotipy.Spotify):
+    def __init__(self, spotify_client: spotipy.Spotify, cache_path: str = "clean_cache.db"):
         self.sp = spotify_client
-
-    def search_track(self, track: Track) -> Optional[Track]:
-        # search for clean version of a track
+        # text search results keyed by lowercase (name, artist), including misses
+        self._search_cache: dict[tuple[str, str], Optional[Track]] = {}
+        # album id -> clean tracks on that album, keyed by normalized name
+        self._album_cache: dict[str, dict[str, Track]] = {}
+        # explicit track id -> the clean track Spotify serves in its place in the user's market
+        self._market_cache: dict[str, Track] = {}
+        # explicit track id -> clean version (or None), kept on disk between runs
+        self._match_cache = TrackMatchCache(cache_path)
+
+    def __enter__(self) -> "SpotifyTrackSearcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._match_cache.close()
+
+    def cache_albums(self, album_ids: list[str]) -> None:
+        # fetch albums in batches of 20 (the API maximum) so their clean tracks can be checked before searching
+        album_ids = [album_id for album_id in dict.fromkeys(album_ids) if album_id and album_id not in self._album_cache]
         try:
-            query = f"{track.name} {track.artist} clean"
-            results = self.sp.search(q = query, type = "track", limit = 50)
-
-            for item in results['tracks']['items']:
-                # instantiate Track object from search result
-                found_track = Track(
+            for i in range(0, len(album_ids), 20):
+                results = _with_retry(self.sp.albums, album_ids[i:i + 20])
+                for album in results['albums']:
+                    if album:
+                        clean_tracks = {}
+                        for item in album['tracks']['items']:
+                            if not item.get("explicit", False):
+                                clean_track = Track(
+                                    id = item['id'],
+                                    name = item['name'],
+                                    artist = item['artists'][0]['name'],
+                                    artist_id = item['artists'][0].get('id'),
+                                    is_clean = True,
+                                    album_id = album['id']
+                                )
+                                clean_tracks.setdefault(clean_track._name_key, clean_track)
+                        self._album_cache[album['id']] = clean_tracks
+        except Exception as e:
+            logger.error("Error fetching albums: %s", e)
+
+    def batch_get_tracks(self, track_ids: list[str]) -> list[Optional[Track]]:
+        # fetch tracks as the user's market sees them, in batches of 50 (the API maximum); Spotify may
+        # relink a track to another release that is playable there (noted in linked_from), and tracks
+        # that aren't playable in the market at all come back as None
+        tracks = []
+        for i in range(0, len(track_ids), 50):
+            results = _with_retry(self.sp.tracks, track_ids[i:i + 50], market = "from_token")
+            for item in results['tracks']:
+                if item and not item.get("is_playable", True):
+                    item = None
+                tracks.append(Track(
                     id = item['id'],
                     name = item['name'],
                     artist = item['artists'][0]['name'],
-                    is_clean = not item.get("explicit", False)
-                )
+                    artist_id = item['artists'][0].get('id'),
+                    is_clean = not item.get("explicit", False),
+                    isrc = item.get('external_ids', {}).get('isrc'),
+                    album_id = item.get('album', {}).get('id')
+                ) if item else None)
+        return tracks
+
+    def cache_tracks(self, tracks: list[Track]) -> None:
+        # some explicit tracks are served as a clean version in the user's market, so look
+        # them up in bulk before searching (skipping tracks already resolved on earlier runs)
+        track_ids = [
+            track_id for track_id in dict.fromkeys(track.id for track in tracks)
+            if track_id and track_id not in self._match_cache and track_id not in self._market_cache
+        ]
+        try:
+            for track_id, market_track in zip(track_ids, self.batch_get_tracks(track_ids)):
+                if market_track and market_track.is_clean:
+                    self._market_cache[track_id] = market_track
+        except Exception as e:
+            logger.error("Error fetching tracks: %s", e)
 
-                # check if this is the clean version of our track
-                if found_track.matches_track(track) and found_track.is_clean:
-                    return found_track
-                
-            return None
+    def search_track(self, track: Track) -> Optional[Track]:
+        # search for clean version of a track, reusing results from earlier runs
+        if track.id:
+            clean_track = self._match_cache.get(track.id)
+            if clean_track is not _MISSING:
+                return clean_track
+
+        try:
+            clean_track = self._search_clean_version(track)
         except Exception as e:
-            logging.error(f"Error searching for track: {str(e)}")
+            # don't cache failures, so the track is searched again next time
+            logger.error("Error searching for track: %s", e)
             return None
-        
+
+        if track.id:
+            self._match_cache.set(track.id, clean_track)
+        return clean_track
+
+    def _search_clean_version(self, track: Track) -> Optional[Track]:
+        # use the clean track Spotify serves in the user's market, if there is one
+        if track.id in self._market_cache:
+            return self._market_cache[track.id]
+
+        # albums often include a clean edit alongside the explicit track under the same name; only take an
+        # exact name match, since fuzzy matching would accept other songs on the album ("Money Trees" for "Money")
+        album_track = self._album_cache.get(track.album_id, {}).get(track._name_key)
+        if album_track and album_track.matches_track(track):
+            return album_track
+
+        clean_track = self._search_by_name(track)
+        if clean_track:
+            return clean_track
+
+        # clean edits are usually separate recordings with their own ISRC, so only as a last resort
+        # look for a release of this exact recording that isn't marked explicit
+        if track.isrc:
+            return self._search_by_query(track, f"isrc:{track.isrc}", limit = 10)
+        return None
+
+    def _search_by_name(self, track: Track) -> Optional[Track]:
+        # the text searches only depend on the name and artist, so other releases of the same song reuse them
+        key = (track._name_lc, track._artist_lc)
+        if key in self._search_cache:
+            return self._search_cache[key]
+
+        # results are ordered by relevance, so the clean version is usually near the top
+        query = f"{track.name} {track.artist} clean".translate(_QUERY_STRIP_TABLE)
+        clean_track = self._search_by_query(track, query, limit = 10)
+
+        # otherwise widen the search with field filters, which don't depend on "clean" being in the title
+        if not clean_track:
+            query = f'track:"{track.name.translate(_QUERY_STRIP_TABLE)}" artist:"{track.artist.translate(_QUERY_STRIP_TABLE)}"'
+            clean_track = self._search_by_query(track, query, limit = 20)
+
+        self._search_cache[key] = clean_track
+        return clean_track
+
+    def _search_by_query(self, track: Track, query: str, limit: int) -> Optional[Track]:
+        results = _with_retry(self.sp.search, q = query, type = "track", limit = limit)
+
+        # check the raw results and only build a Track for the first clean match
+        item = next((
+            item for item in results['tracks']['items']
+            if not item.get("explicit", False)
+            and _names_match(item['name'], item['artists'][0]['name'], item['artists'][0].get('id'), track)
+        ), None)
+        if item is None:
+            return None
+
+        return Track(
+            id = item['id'],
+            name = item['name'],
+            artist = item['artists'][0]['name'],
+            artist_id = item['artists'][0].get('id'),
+            is_clean = True
+        )
+
     def authenticate(self) -> bool:
         pass
 
@@ -143,67 +540,119 @@ class SpotifyTrackSearcher(SpotifyBot):
     def add_tracks(self, playlist_id: str, track_ids: list[str]) -> bool:
         pass
 
-    def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
+    async def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
+        pass
+
+    def stream_playlist(self, playlist_id: str) -> AsyncIterator[tuple[Playlist, list[Track]]]:
+        pass
+
+    def delete_playlist(self, playlist_id: str) -> bool:
         pass
 
 class SpotifyPlaylistManager(SpotifyBot):
-    def __init__(self, spotify_client: spotipy.Spotify):
+    def __init__(self, spotify_client: spotipy.Spotify, max_concurrency: int = 10):
         self.sp = spotify_client
+        # maximum number of playlist pages fetched at once
+        self.max_concurrency = max_concurrency
+        # the current user's ID, fetched on first playlist creation
+        self._user_id: Optional[str] = None
 
-    def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
+    async def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
+        # load the whole playlist, for callers that don't need it page by page
         try:
-            # get playlist data from Spotify API
-            playlist_data = self.sp.playlist(playlist_id)
-
-            # create new Playlist object
-            playlist = Playlist(
-                id=playlist_data['id'],
-                name=playlist_data['name']
-            )
-            
-            # get all tracks (handling pagination)
-            tracks = []
-            results = playlist_data['tracks']
-            tracks.extend(results['items'])
-            
-            while results['next']:
-                results = self.sp.next(results)
-                tracks.extend(results['items'])
-            
-            # add tracks to playlist object
-            playlist.add_track_from_items(tracks)
-            
+            playlist = None
+            async for playlist, _ in self.stream_playlist(playlist_id):
+                pass
             return playlist
-            
         except Exception as e:
-            logging.error(f"Error getting playlist: {str(e)}")
+            logger.error("Error getting playlist: %s", e)
             return None
 
+    async def stream_playlist(self, playlist_id: str) -> AsyncIterator[tuple[Playlist, list[Track]]]:
+        # yield the playlist along with each page of tracks added to it, in order, so callers
+        # can start on the first pages while the rest are still loading
+        playlist_data = await asyncio.to_thread(
+            _with_retry,
+            self.sp.playlist,
+            playlist_id,
+            fields = f"id,name,tracks({_PLAYLIST_ITEM_FIELDS},next,limit,total)"
+        )
+
+        # create new Playlist object
+        playlist = Playlist(
+            id=playlist_data['id'],
+            name=playlist_data['name']
+        )
+
+        results = playlist_data['tracks']
+        yield playlist, playlist.add_track_from_items(results['items'])
+        if not results['next']:
+            return
+
+        # the first page comes with the playlist, so fetch every other page in parallel
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_page(offset: int) -> dict:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    _with_retry,
+                    self.sp.playlist_items,
+                    playlist_id,
+                    fields = _PLAYLIST_ITEM_FIELDS,
+                    offset = offset,
+                    limit = results['limit'],
+                    # like sp.playlist, return podcast episodes in their track form (with artists)
+                    additional_types = ("track",)
+                )
+
+        offsets = range(results['limit'], results['total'], results['limit'])
+        pages = [asyncio.create_task(fetch_page(offset)) for offset in offsets]
+        try:
+            for page in pages:
+                yield playlist, playlist.add_track_from_items((await page)['items'])
+        finally:
+            # stop fetching if the caller stops early or a page fails
+            for page in pages:
+                page.cancel()
+
     def create_playlist(self, name: str, description: str = "") -> Optional[str]:
         # create the new playlist and return its ID
         try:
-            user_id = self.sp.me()['id']
-            playlist = self.sp.user_playlist_create(
-                user_id,
+            if self._user_id is None:
+                self._user_id = _with_retry(self.sp.me)['id']
+            playlist = _with_retry(
+                self.sp.user_playlist_create,
+                self._user_id,
                 name,
                 public = True,
                 description = description
             )
             return playlist['id']
         except Exception as e:
-            logging.error(f"Error creating playlist: {str(e)}")
+            logger.error("Error creating playlist: %s", e)
             return None
     
     def add_tracks(self, playlist_id: str, track_ids: list[str]) -> bool:
         try:
-            # split track_ids into chunks of 100
+            # split track_ids into chunks of 100 (the API maximum), sent one at a time: concurrent
+            # requests would append in arrival order, and an explicit position past the current
+            # end of the playlist is rejected, so only sequential requests keep the track order
             for i in range(0, len(track_ids), 100):
                 chunk = track_ids[i:i + 100]
-                self.sp.playlist_add_items(playlist_id, chunk)
-                print(f"Added tracks {i+1} to {i+len(chunk)}")
+                _with_retry(self.sp.playlist_add_items, playlist_id, chunk)
+                logger.debug("Added tracks %d to %d", i + 1, i + len(chunk))
+            return True
+        except Exception as e:
+            logger.error("Error adding tracks: %s", e)
+            return False
+
+    def delete_playlist(self, playlist_id: str) -> bool:
+        # Spotify has no real delete; unfollowing your own playlist removes it from your library
+        try:
+            _with_retry(self.sp.current_user_unfollow_playlist, playlist_id)
             return True
         except Exception as e:
-            logging.error(f"Error adding tracks: {str(e)}")
+            logger.error("Error deleting playlist: %s", e)
             return False
     
     def authenticate(self) -> bool:
@@ -212,178 +661,325 @@ class SpotifyPlaylistManager(SpotifyBot):
     def search_track(self, track: Track) -> Optional[Track]:
         pass
 
-class SpotifyBotDecorator(SpotifyBot, ABC):
+    def cache_tracks(self, tracks: list[Track]) -> None:
+        pass
+
+    def cache_albums(self, album_ids: list[str]) -> None:
+        pass
+
+def timed(method):
+    # log how long a decorated bot method took (for coroutines, until they return, and for
+    # async generators, until they're exhausted)
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            start_time = time.perf_counter()
+            async for item in method(self, *args, **kwargs):
+                yield item
+            logger.info("Processing Time (%s): %.2f seconds", method.__name__, time.perf_counter() - start_time)
+        return wrapper
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            start_time = time.perf_counter()
+            result = await method(self, *args, **kwargs)
+            logger.info("Processing Time (%s): %.2f seconds", method.__name__, time.perf_counter() - start_time)
+            return result
+        return wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        logger.info("Processing Time (%s): %.2f seconds", method.__name__, time.perf_counter() - start_time)
+        return result
+    return wrapper
+
+class SpotifyBotDecorator(ABC):
     def __init__(self, spotify_bot):
         self._bot = spotify_bot
 
-    @property
-    def sp(self):
-        return self._bot.sp
+    def __getattr__(self, name):
+        # anything a decorator doesn't override (including sp) is looked up on the wrapped bot,
+        # so pass-through calls go straight to it without an extra method call
+        return getattr(self._bot, name)
+
+# decorators only override the methods they log, so they don't inherit
+# SpotifyBot's abstract methods but are still registered as SpotifyBots
+SpotifyBot.register(SpotifyBotDecorator)
 
 # concrete decorator classes
 class AuthenticatorLoggingDecorator(SpotifyBotDecorator):
+    @timed
     def authenticate(self) -> bool:
-        print("\n--- Authentication Process ---")
-        start_time = time.time()
-        
+        logger.info("--- Authentication Process ---")
         result = self._bot.authenticate()
-        
-        processing_time = time.time() - start_time
-        print(f"Authentication {'Successful' if result else 'Failed'}")
-        print(f"Processing Time: {processing_time:.2f} seconds")
-        
+        logger.info("Authentication %s", "Successful" if result else "Failed")
         return result
 
-    # delegate other methods to the wrapped bot
-    def search_track(self, track: Track) -> Optional[Track]:
-        return self._bot.search_track(track)
-
-    def create_playlist(self, name: str, description: str = "") -> Optional[str]:
-        return self._bot.create_playlist(name, description)
-
-    def add_tracks(self, playlist_id: str, track_ids: list[str]) -> bool:
-        return self._bot.add_tracks(playlist_id, track_ids)
-
-    def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
-        return self._bot.get_playlist(playlist_id)
-
 class TrackSearcherLoggingDecorator(SpotifyBotDecorator):
     def search_track(self, track: Track) -> Optional[Track]:
-        print(f"\n--- Searching for Clean Version ---")
-        print(f"Track: {track}")
-        start_time = time.time()
+        # searches run concurrently, so per-track details are debug only and
+        # CleanPlaylistCreator logs a summary once they have all finished
+        if not logger.isEnabledFor(logging.DEBUG):
+            return self._bot.search_track(track)
+
+        start_time = time.perf_counter()
         
         result = self._bot.search_track(track)
         
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
         if result:
-            print(f"Found clean version: {result}")
+            logger.debug("Found clean version of %s: %s (%.2f seconds)", track, result, processing_time)
         else:
-            print("No clean version found")
-        print(f"Search Time: {processing_time:.2f} seconds")
+            logger.debug("No clean version found for %s (%.2f seconds)", track, processing_time)
         
         return result
 
-    # delegate other methods
-    def authenticate(self) -> bool:
-        return self._bot.authenticate()
-
-    def create_playlist(self, name: str, description: str = "") -> Optional[str]:
-        return self._bot.create_playlist(name, description)
-
-    def add_tracks(self, playlist_id: str, track_ids: list[str]) -> bool:
-        return self._bot.add_tracks(playlist_id, track_ids)
-
-    def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
-        return self._bot.get_playlist(playlist_id)
-
 class PlaylistManagerLoggingDecorator(SpotifyBotDecorator):
+    @timed
     def create_playlist(self, name: str, description: str = "") -> Optional[str]:
-        print(f"\n--- Creating Playlist ---")
-        print(f"Name: {name}")
-        start_time = time.time()
-        
+        logger.info("--- Creating Playlist ---")
+        logger.info("Name: %s", name)
         playlist_id = self._bot.create_playlist(name, description)
-        
-        processing_time = time.time() - start_time
-        print(f"{'Successfully created' if playlist_id else 'Failed to create'} playlist")
-        print(f"Processing Time: {processing_time:.2f} seconds")
-        
+        logger.info("%s playlist", "Successfully created" if playlist_id else "Failed to create")
         return playlist_id
 
+    @timed
     def add_tracks(self, playlist_id: str, track_ids: list[str]) -> bool:
-        print(f"\n--- Adding Tracks to Playlist ---")
-        print(f"Number of tracks to add: {len(track_ids)}")
-        start_time = time.time()
-        
+        logger.info("--- Adding Tracks to Playlist ---")
+        logger.info("Number of tracks to add: %d", len(track_ids))
         success = self._bot.add_tracks(playlist_id, track_ids)
-        
-        processing_time = time.time() - start_time
-        print(f"{'Successfully added' if success else 'Failed to add'} tracks")
-        print(f"Processing Time: {processing_time:.2f} seconds")
-        
+        logger.info("%s tracks", "Successfully added" if success else "Failed to add")
         return success
 
-    def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
-        print(f"\n--- Fetching Playlist ---")
-        print(f"Playlist ID: {playlist_id}")
-        start_time = time.time()
-        
-        playlist = self._bot.get_playlist(playlist_id)
-        
-        processing_time = time.time() - start_time
+    @timed
+    async def get_playlist(self, playlist_id: str) -> Optional[Playlist]:
+        self._log_fetching(playlist_id)
+        playlist = await self._bot.get_playlist(playlist_id)
+        self._log_fetched(playlist)
+        return playlist
+
+    @timed
+    async def stream_playlist(self, playlist_id: str) -> AsyncIterator[tuple[Playlist, list[Track]]]:
+        self._log_fetching(playlist_id)
+        playlist = None
+        async for playlist, tracks in self._bot.stream_playlist(playlist_id):
+            yield playlist, tracks
+        self._log_fetched(playlist)
+
+    def _log_fetching(self, playlist_id: str) -> None:
+        logger.info("--- Fetching Playlist ---")
+        logger.info("Playlist ID: %s", playlist_id)
+
+    def _log_fetched(self, playlist: Optional[Playlist]) -> None:
         if playlist:
-            print(f"Successfully fetched playlist: {playlist}")
-            print(f"Total tracks: {playlist.get_track_count()}")
+            logger.info("Successfully fetched playlist: %s", playlist)
+            logger.info("Total tracks: %d", playlist.get_track_count())
         else:
-            print("Failed to fetch playlist")
-        print(f"Processing Time: {processing_time:.2f} seconds")
-        
-        return playlist
+            logger.info("Failed to fetch playlist")
+
+class CleanPlaylistCreator:
+    def __init__(self, playlist_bot: SpotifyBot, track_bot: SpotifyBot, max_concurrency: int = 10):
+        self.playlist_bot = playlist_bot
+        self.track_bot = track_bot
+        self.max_concurrency = max_concurrency
+
+    async def _clean_track_id_chunks(self, batches, chunk_size: int = 100):
+        # search for clean versions concurrently, bounded so we don't flood the API
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def prefetch(tracks: list[Track], album_ids: list[str]) -> None:
+            # look up explicit tracks and their albums in bulk, so most tracks don't need a search
+            await asyncio.gather(
+                asyncio.to_thread(self.track_bot.cache_tracks, tracks),
+                asyncio.to_thread(self.track_bot.cache_albums, album_ids)
+            )
 
-    # delegate other methods
-    def authenticate(self) -> bool:
-        return self._bot.authenticate()
+        stopped = False
+
+        async def bounded_search(track: Track, prefetched: asyncio.Task) -> Optional[Track]:
+            await prefetched
+            async with semaphore:
+                if stopped:
+                    return None
+                # spotipy is synchronous, so run each search in a worker thread
+                return await asyncio.to_thread(self.track_bot.search_track, track)
+
+        # tracks in playlist order, queued as their pages arrive (None marks the end)
+        queue = asyncio.Queue()
+        searches = {}
+
+        async def dispatch() -> None:
+            # start searching each page as soon as it arrives, while later pages are still loading;
+            # explicit tracks that appear multiple times are only looked up once
+            try:
+                async for batch in batches:
+                    unique_explicit = {}
+                    album_ids = []
+                    for track in batch:
+                        if not track.is_clean and track.id not in searches and track.id not in unique_explicit:
+                            unique_explicit[track.id] = track
+                            album_ids.append(track.album_id)
+                    if unique_explicit:
+                        prefetched = asyncio.create_task(prefetch(list(unique_explicit.values()), album_ids))
+                        for track_id, track in unique_explicit.items():
+                            searches[track_id] = asyncio.create_task(bounded_search(track, prefetched))
+                    for track in batch:
+                        queue.put_nowait(track)
+            finally:
+                queue.put_nowait(None)
+
+        start_time = time.perf_counter()
+        dispatcher = asyncio.create_task(dispatch())
+
+        # yield clean track IDs in original order as soon as each chunk is resolved,
+        # counting what happened to each track on the way for the summary
+        chunk = []
+        explicit_count = replaced_count = 0
+        try:
+            while (track := await queue.get()) is not None:
+                if track.is_clean:
+                    chunk.append(track.id)
+                else:
+                    explicit_count += 1
+                    clean_track = await searches[track.id]
+                    if clean_track:
+                        replaced_count += 1
+                        chunk.append(clean_track.id)
+
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+
+            # raise any error from loading the playlist rather than leaving it half copied
+            await dispatcher
+        finally:
+            # if the caller stops early or loading fails, don't start any more searches, but let
+            # running ones finish so none are still using the searcher once we return
+            stopped = True
+            dispatcher.cancel()
+            await asyncio.gather(*searches.values(), return_exceptions = True)
+
+        # summarise once all searches are done instead of logging each one as it finishes
+        logger.info("Found clean versions for %d of %d explicit tracks", replaced_count, explicit_count)
+        logger.info("Search Time: %.2f seconds", time.perf_counter() - start_time)
+
+        if chunk:
+            yield chunk
+
+    async def _add_clean_tracks(self, batches, clean_playlist_id: str) -> bool:
+        # upload each chunk while later searches are still running; uploads stay
+        # sequential so the clean playlist keeps the original track order
+        chunks = self._clean_track_id_chunks(batches)
+        upload = None
+        try:
+            async for chunk in chunks:
+                if upload and not await upload:
+                    return False
+                upload = asyncio.create_task(asyncio.to_thread(self.playlist_bot.add_tracks, clean_playlist_id, chunk))
+
+            return await upload if upload else True
+        finally:
+            # stop searching if an upload failed, and don't leave an upload running if searching failed
+            await chunks.aclose()
+            if upload:
+                await asyncio.wait([upload])
+
+    async def create_clean_playlist(self, playlist_id: str) -> Optional[str]:
+        # the playlist comes with its first page of tracks, which is enough to name the clean copy
+        pages = self.playlist_bot.stream_playlist(playlist_id)
+        try:
+            playlist, first_page = await anext(pages)
+        except Exception as e:
+            logger.error("Error getting playlist: %s", e)
+            return None
 
-    def search_track(self, track: Track) -> Optional[Track]:
-        return self._bot.search_track(track)
+        async def batches():
+            yield first_page
+            async for _, tracks in pages:
+                yield tracks
+
+        # create new playlist
+        clean_playlist_id = await asyncio.to_thread(
+            self.playlist_bot.create_playlist,
+            f"{playlist.name} (Clean)",
+            "Clean version generated by SpotifyBot"
+        )
+        if not clean_playlist_id:
+            await pages.aclose()
+            return None
+
+        # process tracks as the remaining pages load and add them to the new playlist
+        try:
+            success = await self._add_clean_tracks(batches(), clean_playlist_id)
+        except Exception as e:
+            # searches and uploads handle their own errors, so this is a later page failing to load
+            logger.error("Error getting playlist: %s", e)
+            success = False
+
+        # the clean playlist is created before the whole original has loaded, so don't
+        # leave a partial copy behind if anything went wrong
+        if not success:
+            if await asyncio.to_thread(self.playlist_bot.delete_playlist, clean_playlist_id):
+                logger.info("Removed the incomplete clean playlist")
+            return None
+
+        return clean_playlist_id
 
 
-def main():
+async def main():
     load_dotenv()
     CLIENT_ID = os.getenv("CLIENT_ID")
     CLIENT_SECRET = os.getenv("CLIENT_SECRET")
     REDIRECT_URI = "http://localhost:8888/callback"
+
+    # the API call ceiling (per minute) can be lowered or raised in the environment
+    rate_limit = os.getenv("RATE_LIMIT")
+    if rate_limit:
+        if rate_limit.strip().isdigit() and int(rate_limit) >= 1:
+            _rate_limiter.set_rate(int(rate_limit))
+        else:
+            logger.error("Ignoring RATE_LIMIT=%r, it must be a whole number of calls per minute", rate_limit)
     
+    # spotipy is synchronous, so its calls run in worker threads; one per pooled HTTP
+    # connection, which covers concurrent searches, page fetches and uploads
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers = CONNECTION_POOL_SIZE))
+
     # create and decorate the authentication bot
     auth_bot = SpotifyAuthenticator(CLIENT_ID, CLIENT_SECRET, REDIRECT_URI)
     auth_bot = AuthenticatorLoggingDecorator(auth_bot)
     
     # authenticate
     if not auth_bot.authenticate():
-        print("Authentication failed!")
+        logger.error("Authentication failed!")
         return
     
     # create and decorate the playlist manager bot
     playlist_bot = SpotifyPlaylistManager(auth_bot.sp)
     playlist_bot = PlaylistManagerLoggingDecorator(playlist_bot)
     
-    # create and decorate the track searcher bot
-    track_bot = SpotifyTrackSearcher(auth_bot.sp)
-    track_bot = TrackSearcherLoggingDecorator(track_bot)
-    
-    # get playlist ID from user
-    playlist_id = input("Enter playlist ID: ")
-    
-    # Get playlist
-    original_playlist = playlist_bot.get_playlist(playlist_id)
-    if not original_playlist:
-        print("Failed to get playlist!")
-        return
-    
-    # create new playlist
-    clean_playlist_id = playlist_bot.create_playlist(
-        f"{original_playlist.name} (Clean)",
-        "Clean version generated by SpotifyBot"
-    )
-    if not clean_playlist_id:
-        print("Failed to create clean playlist!")
-        return
-    
-    # process tracks
-    clean_track_ids = []
-    for track in original_playlist.tracks:
-        if track.is_clean:
-            clean_track_ids.append(track.id)
-        else:
-            clean_track = track_bot.search_track(track)
-            if clean_track:
-                clean_track_ids.append(clean_track.id)
-    
-    # add tracks to new playlist
-    if clean_track_ids:
-        playlist_bot.add_tracks(clean_playlist_id, clean_track_ids)
+    # create and decorate the track searcher bot (closing its match cache when done)
+    with SpotifyTrackSearcher(auth_bot.sp) as track_searcher:
+        track_bot = TrackSearcherLoggingDecorator(track_searcher)
+        
+        # show everything logged so far before waiting for input
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+
+        # get playlist ID from user
+        playlist_id = input("Enter playlist ID: ")
+        
+        # create clean playlist, searching for clean tracks while the playlist loads
+        creator = CleanPlaylistCreator(playlist_bot, track_bot)
+        if not await creator.create_clean_playlist(playlist_id):
+            logger.error("Failed to create clean playlist!")
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
-    main()
\ No newline at end of file
+    # buffer log output so worker threads don't wait on console writes; it's written out
+    # every 100 records, on errors, before prompting and at exit
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.MemoryHandler(100, target=console)])
+    asyncio.run(main())
\ No newline at end of file